@@ -2,17 +2,37 @@
 
 from __future__ import annotations
 
+import json
 import os
+import random
 import sys
 import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
+from pathlib import Path
+from typing import TypeVar
 
 from atproto import Client, models, exceptions
 
+_T = TypeVar("_T")
+
 # Delay between write operations to stay within Bluesky's rate limits.
 # See: https://docs.bsky.app/docs/advanced-guides/rate-limits
 _WRITE_DELAY_SECONDS = 1.0
 
+# Maximum number of operations accepted by com.atproto.repo.applyWrites.
+_APPLY_WRITES_BATCH_SIZE = 200
+
+# Backoff schedule for retrying failed write operations. Bursty writes can
+# hit 429s; a short bounded retry recovers most of them.
+_RETRY_BACKOFF_SECONDS = (0.5, 2.0, 8.0)
+
+# On-disk cache of fetched follower/block sets, keyed by repo rev where the
+# data lives in a single repo. Best-effort: any cache failure falls back to
+# a normal fetch.
+_CACHE_DIR = Path.home() / ".cache" / "bluesky-sync"
+
 # ANSI Color codes for prettier logging
 COLOR_RESET = "\033[0m"
 COLOR_GREEN = "\033[92m"  # Success messages
@@ -29,6 +49,18 @@ class LogColor(Enum):
     NORMAL = ""
 
 
+# Per-level format strings, precomputed at import time so log() does a single
+# dict lookup and interpolation per call. Colors are dropped entirely when
+# stdout is not a terminal, keeping piped output free of escape codes.
+_COLOR_ENABLED = sys.stdout.isatty()
+_LOG_FORMATS = {
+    color: f"{color.value}%s{COLOR_RESET}\n"
+    if _COLOR_ENABLED and color.value
+    else "%s\n"
+    for color in LogColor
+}
+
+
 def log(message: str, color: LogColor = LogColor.NORMAL, error: bool = False) -> None:
     """Print a colored log message.
 
@@ -37,8 +69,8 @@ def log(message: str, color: LogColor = LogColor.NORMAL, error: bool = False) ->
         color: The color state for the message.
         error: If True, print to stderr instead of stdout.
     """
-    colored_message = f"{color.value}{message}{COLOR_RESET}" if color.value else message
-    print(colored_message, file=sys.stderr if error else sys.stdout)
+    stream = sys.stderr if error else sys.stdout
+    stream.write(_LOG_FORMATS[color] % message)
 
 
 def require_env(name: str) -> str:
@@ -59,10 +91,96 @@ def require_env(name: str) -> str:
     return value
 
 
+def _cache_path(did: str, collection: str) -> Path:
+    """Return the cache file path for a (did, collection) pair.
+
+    Args:
+        did: The DID the cached data belongs to.
+        collection: The collection (or pseudo-collection) the data came from.
+
+    Returns:
+        The path of the JSON cache file.
+    """
+    return _CACHE_DIR / f"{did}-{collection}.json"
+
+
+def _read_cache(did: str, collection: str) -> dict | None:
+    """Load a cached payload for a (did, collection) pair, if present.
+
+    Args:
+        did: The DID the cached data belongs to.
+        collection: The collection the data came from.
+
+    Returns:
+        The cached payload, or None if the cache is missing or unreadable.
+    """
+    try:
+        with open(_cache_path(did, collection)) as fh:
+            return json.load(fh)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _write_cache(did: str, collection: str, payload: dict) -> None:
+    """Write a payload to the cache for a (did, collection) pair.
+
+    Failures are ignored: the cache only exists to skip redundant fetches.
+
+    Args:
+        did: The DID the cached data belongs to.
+        collection: The collection the data came from.
+        payload: The JSON-serializable payload to store.
+    """
+    try:
+        _CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with open(_cache_path(did, collection), "w") as fh:
+            json.dump(payload, fh)
+    except OSError:
+        pass
+
+
+def _write_follower_snapshot(did: str, followers: set[str]) -> None:
+    """Record the follower set that a run has fully processed.
+
+    Snapshots are written only after a non-dry run applies every block it
+    attempted (or finds nothing to do). Dry runs, failed batches, and
+    interrupted runs leave the previous snapshot in place, so the affected
+    DIDs are picked up again on the next invocation.
+
+    Args:
+        did: The account DID the snapshot belongs to.
+        followers: The follower set that was fully processed.
+    """
+    # Follower edges live in the followers' repos, so no single rev can
+    # validate this set; it is kept for run-to-run comparison only.
+    _write_cache(did, "followers", {"rev": None, "dids": sorted(followers)})
+
+
+def _get_repo_rev(client: Client, did: str) -> str | None:
+    """Fetch the current commit rev of a repo, if available.
+
+    Args:
+        client: Authenticated Bluesky client.
+        did: The DID of the repo.
+
+    Returns:
+        The repo's latest commit rev, or None if it could not be fetched.
+    """
+    try:
+        return client.com.atproto.sync.get_latest_commit({"did": did}).rev
+    except exceptions.AtProtocolError:
+        return None
+
+
 def get_follower_dids(client: Client, actor: str) -> set[str]:
     """Fetch all DIDs of accounts that follow a given actor.
 
     Uses pagination to retrieve all followers, handling cursors automatically.
+    The next page is requested on a background thread while the current page
+    is processed, overlapping one round trip per page. getFollowers with the
+    API-maximum page size of 100 is the only way to enumerate followers:
+    the follow records live in the followers' own repos, so they cannot be
+    listed in bulk via com.atproto.repo.listRecords like blocks can.
 
     Args:
         client: Authenticated Bluesky client.
@@ -72,55 +190,84 @@ def get_follower_dids(client: Client, actor: str) -> set[str]:
         A set of DIDs representing all accounts that follow the actor.
     """
     dids: set[str] = set()
-    cursor: str | None = None
 
-    while True:
-        response = client.app.bsky.graph.get_followers(
+    def fetch_page(cursor: str | None):
+        return client.app.bsky.graph.get_followers(
             {"actor": actor, "limit": 100, "cursor": cursor}
         )
-        for follower in response.followers:
-            did = getattr(follower, "did", None)
-            if did:
-                dids.add(did)
-            else:
-                log(
-                    f"⚠ Skipping follower record with no DID: {follower}",
-                    LogColor.WARNING,
-                )
-        cursor = response.cursor
-        if not cursor:
-            break
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(fetch_page, None)
+        while True:
+            response = future.result()
+            if response.cursor:
+                future = executor.submit(fetch_page, response.cursor)
+            dids.update(
+                follower.did
+                for follower in response.followers
+                if getattr(follower, "did", None)
+            )
+            if not response.cursor:
+                break
 
     return dids
 
 
-def get_block_dids(client: Client) -> set[str]:
-    """Fetch all DIDs that the authenticated user has blocked.
+def get_block_records(client: Client, repo: str) -> dict[str, str]:
+    """Fetch all block records in a repo, indexed by blocked DID.
 
-    Uses pagination to retrieve all blocks, handling cursors automatically.
+    Uses pagination to retrieve all block records in a single pass, handling
+    cursors automatically. The next page is requested on a background thread
+    while the current page is processed, overlapping one round trip per page.
+    The returned index maps each blocked DID to the record key of its block
+    record, so callers can both test membership and delete individual blocks
+    without re-scanning the repo. The index is cached on disk keyed by the
+    repo's commit rev; when the rev is unchanged since the last run, the
+    paginated fetch is skipped entirely.
 
     Args:
         client: Authenticated Bluesky client.
+        repo: The DID of the repo whose block records to retrieve.
 
     Returns:
-        A set of DIDs representing all accounts the authenticated user has blocked.
+        A dict mapping each blocked DID to the rkey of its block record.
     """
-    dids: set[str] = set()
-    cursor: str | None = None
-
-    while True:
-        response = client.app.bsky.graph.get_blocks({"limit": 100, "cursor": cursor})
-        for profile in response.blocks:
-            did = getattr(profile, "did", None)
-            if did:
-                dids.add(did)
-            else:
-                log(f"⚠ Skipping block record with no DID: {profile}", LogColor.WARNING)
-        cursor = response.cursor
-        if not cursor:
-            break
+    rev = _get_repo_rev(client, repo)
+    cached = _read_cache(repo, "app.bsky.graph.block")
+    if rev and cached and cached.get("rev") == rev:
+        return dict(cached["records"])
+
+    rkeys_by_did: dict[str, str] = {}
+
+    def fetch_page(cursor: str | None):
+        return client.com.atproto.repo.list_records(
+            {
+                "repo": repo,
+                "collection": "app.bsky.graph.block",
+                "limit": 100,
+                "cursor": cursor,
+            }
+        )
 
-    return dids
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(fetch_page, None)
+        while True:
+            response = future.result()
+            if response.cursor:
+                future = executor.submit(fetch_page, response.cursor)
+            rkeys_by_did.update(
+                (record.value.subject, record.uri.rpartition("/")[2])
+                for record in response.records
+                if getattr(record.value, "subject", None)
+            )
+            if not response.cursor:
+                break
+
+    if rev:
+        _write_cache(
+            repo, "app.bsky.graph.block", {"rev": rev, "records": rkeys_by_did}
+        )
+    return rkeys_by_did
 
 
 def _resolve_handle(client: Client, did: str) -> str:
@@ -143,6 +290,11 @@ def _resolve_handle(client: Client, did: str) -> str:
 def _login(handle: str, password: str) -> tuple[Client, str]:
     """Login to a Bluesky account and return the client and DID.
 
+    The session string from a successful login is persisted under the cache
+    directory and reused on later runs, so repeated invocations refresh an
+    existing session instead of calling createSession (rate-limited to 30
+    per 5 minutes). A stale saved session falls back to a password login.
+
     Args:
         handle: The account handle.
         password: The app password.
@@ -150,32 +302,116 @@ def _login(handle: str, password: str) -> tuple[Client, str]:
     Returns:
         A tuple of (authenticated client, account DID).
     """
+    session_path = _CACHE_DIR / f"{handle}-session.txt"
     client = Client()
+    profile = None
     try:
-        profile = client.login(handle, password)
-    except exceptions.AtProtocolError as exc:
-        log(f"Login failed for {handle}: {exc}", LogColor.ERROR, error=True)
-        sys.exit(1)
+        session_string = session_path.read_text()
+    except OSError:
+        session_string = None
+    if session_string:
+        try:
+            profile = client.login(session_string=session_string)
+        except exceptions.AtProtocolError:
+            # Stale or revoked session; retry with the app password below.
+            client = Client()
+    if profile is None:
+        try:
+            profile = client.login(handle, password)
+        except exceptions.AtProtocolError as exc:
+            log(f"Login failed for {handle}: {exc}", LogColor.ERROR, error=True)
+            sys.exit(1)
+    try:
+        _CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        session_path.write_text(client.export_session_string())
+        session_path.chmod(0o600)
+    except OSError:
+        pass
     assert client.me is not None
     return client, profile.did
 
 
+def _retry(fn: Callable[..., _T], *args: object) -> _T:
+    """Call a write operation, retrying transient failures with backoff.
+
+    Retries once per entry in the backoff schedule, honoring the server's
+    Retry-After header when present and applying ±20% jitter so concurrent
+    retries do not synchronize. The final failure is re-raised.
+
+    Args:
+        fn: The API call to invoke.
+        *args: Arguments to pass to the call.
+
+    Returns:
+        Whatever the call returns.
+
+    Raises:
+        exceptions.AtProtocolError: If every attempt fails.
+    """
+    for attempt, backoff in enumerate(_RETRY_BACKOFF_SECONDS):
+        try:
+            return fn(*args)
+        except exceptions.AtProtocolError as exc:
+            if attempt == len(_RETRY_BACKOFF_SECONDS) - 1:
+                raise
+            headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+            try:
+                retry_after = float(headers.get("retry-after", 0))
+            except (TypeError, ValueError):
+                retry_after = 0.0
+            time.sleep(max(retry_after, backoff) * random.uniform(0.8, 1.2))
+    raise AssertionError("unreachable: final retry attempt re-raises")
+
+
 def _block_accounts(
-    client: Client, handle: str, dids: list[str], dry_run: bool = False
-) -> None:
-    """Block a list of accounts on the given client.
+    client: Client, handle: str, dids: set[str], dry_run: bool = False
+) -> bool:
+    """Block a set of accounts on the given client.
 
     Args:
         client: Authenticated Bluesky client.
         handle: The handle of the account performing the blocks (for logging).
-        dids: List of DIDs to block.
+        dids: DIDs to block.
         dry_run: If True, log what would be blocked without making any changes.
 
+    Returns:
+        True if every block batch was applied, False if any batch failed
+        after retries. A dry run applies nothing and returns True.
+
     Note:
         CREATE operations cost 3 rate-limit points (~1,666 creates/hour, ~11,666/day).
+        Creates are batched through com.atproto.repo.applyWrites, which accepts
+        up to 200 operations per call, so a batch costs one HTTPS round trip.
         See: https://docs.bsky.app/docs/advanced-guides/rate-limits
     """
     assert client.me is not None
+    repo = client.me.did
+    # One timestamp for the whole run; the records' creation times do not
+    # need sub-second fidelity and this avoids a datetime build per record.
+    now_iso = client.get_current_time_iso()
+    writes: list[models.ComAtprotoRepoApplyWrites.Create] = []
+    all_applied = True
+
+    def flush() -> None:
+        nonlocal all_applied
+        if not writes:
+            return
+        try:
+            _retry(
+                client.com.atproto.repo.apply_writes,
+                {"repo": repo, "writes": writes},
+            )
+            log(f"  ✓ Blocked {len(writes)} accounts on {handle}", LogColor.SUCCESS)
+        except exceptions.AtProtocolError as exc:
+            all_applied = False
+            log(
+                f"  ✗ Failed to block {len(writes)} accounts on {handle}: {exc}",
+                LogColor.ERROR,
+                error=True,
+            )
+        writes.clear()
+        time.sleep(_WRITE_DELAY_SECONDS)
+
     for did in dids:
         if dry_run:
             label = _resolve_handle(client, did)
@@ -183,18 +419,17 @@ def _block_accounts(
             continue
         record = models.AppBskyGraphBlock.Record(
             subject=did,
-            created_at=client.get_current_time_iso(),
+            created_at=now_iso,
         )
-        try:
-            client.app.bsky.graph.block.create(client.me.did, record)
-            log(f"  ✓ Blocked {did} on {handle}", LogColor.SUCCESS)
-        except exceptions.AtProtocolError as exc:
-            log(
-                f"  ✗ Failed to block {did} on {handle}: {exc}",
-                LogColor.ERROR,
-                error=True,
+        writes.append(
+            models.ComAtprotoRepoApplyWrites.Create(
+                collection="app.bsky.graph.block", value=record
             )
-        time.sleep(_WRITE_DELAY_SECONDS)
+        )
+        if len(writes) >= _APPLY_WRITES_BATCH_SIZE:
+            flush()
+    flush()
+    return all_applied
 
 
 def main() -> None:
@@ -232,54 +467,80 @@ def main() -> None:
     log(f"Account A: {handle_a} ({did_a})")
     log(f"Account B: {handle_b} ({did_b})")
 
-    log("📊 Fetching followers for Account A...")
-    try:
-        followers_a = get_follower_dids(client_a, did_a)
-    except exceptions.AtProtocolError as exc:
-        log(f"Error fetching followers for A: {exc}", LogColor.ERROR, error=True)
-        sys.exit(1)
+    # Follower snapshots from the last run that fully applied its blocks;
+    # they let the steady-state run act only on follower changes since
+    # then. Delete the cache to force a full pass.
+    prev_snapshot_a = _read_cache(did_a, "followers")
+    prev_snapshot_b = _read_cache(did_b, "followers")
+
+    log("📊 Fetching followers and blocks for both accounts...")
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        followers_a_future = executor.submit(get_follower_dids, client_a, did_a)
+        followers_b_future = executor.submit(get_follower_dids, client_b, did_b)
+        blocks_a_future = executor.submit(get_block_records, client_a, did_a)
+        blocks_b_future = executor.submit(get_block_records, client_b, did_b)
+        try:
+            followers_a = followers_a_future.result()
+            followers_b = followers_b_future.result()
+            block_records_a = blocks_a_future.result()
+            block_records_b = blocks_b_future.result()
+        except exceptions.AtProtocolError as exc:
+            log(f"Error fetching account data: {exc}", LogColor.ERROR, error=True)
+            sys.exit(1)
+    blocks_a = block_records_a.keys()
+    blocks_b = block_records_b.keys()
     log(f"✓ Account A has {len(followers_a)} followers")
-
-    log("📊 Fetching followers for Account B...")
-    try:
-        followers_b = get_follower_dids(client_b, did_b)
-    except exceptions.AtProtocolError as exc:
-        log(f"Error fetching followers for B: {exc}", LogColor.ERROR, error=True)
-        sys.exit(1)
     log(f"✓ Account B has {len(followers_b)} followers")
-
-    log("🚫 Fetching blocks for Account A...")
-    try:
-        blocks_a = get_block_dids(client_a)
-    except exceptions.AtProtocolError as exc:
-        log(f"Error fetching blocks for A: {exc}", LogColor.ERROR, error=True)
-        sys.exit(1)
     log(f"✓ Account A blocks {len(blocks_a)} accounts")
-
-    log("🚫 Fetching blocks for Account B...")
-    try:
-        blocks_b = get_block_dids(client_b)
-    except exceptions.AtProtocolError as exc:
-        log(f"Error fetching blocks for B: {exc}", LogColor.ERROR, error=True)
-        sys.exit(1)
     log(f"✓ Account B blocks {len(blocks_b)} accounts")
 
+    # DIDs never to block on each account: existing blocks plus the account
+    # itself, folded into one set so each difference below is a single pass.
+    exclusions_a = blocks_a | {did_a}
+    exclusions_b = blocks_b | {did_b}
+
     # Everyone who follows B → block on A
-    to_block_on_a = sorted((followers_b - blocks_a) - {did_a})
+    to_block_on_a = followers_b - exclusions_a
+    # Everyone who follows A but not B → block on B
+    to_block_on_b = followers_a - followers_b - exclusions_b
+
+    # With snapshots from a previous run, only DIDs whose follow state
+    # changed since then can need action: A-side targets come from new
+    # followers of B, and B-side targets from new followers of A or
+    # accounts that unfollowed B.
+    if prev_snapshot_b is not None:
+        prev_followers_b = set(prev_snapshot_b["dids"])
+        to_block_on_a &= followers_b - prev_followers_b
+        if prev_snapshot_a is not None:
+            prev_followers_a = set(prev_snapshot_a["dids"])
+            to_block_on_b &= (followers_a - prev_followers_a) | (
+                prev_followers_b - followers_b
+            )
+
+    if not to_block_on_a and not to_block_on_b:
+        log("✓ Nothing to do. Accounts are already in sync.", LogColor.SUCCESS)
+        if not dry_run:
+            _write_follower_snapshot(did_a, followers_a)
+            _write_follower_snapshot(did_b, followers_b)
+        return
+
+    applied_a = True
+    applied_b = True
     if to_block_on_a:
         log(f"🚫 Blocking {len(to_block_on_a)} of B's followers on A...")
-        _block_accounts(client_a, handle_a, to_block_on_a, dry_run=dry_run)
+        applied_a = _block_accounts(client_a, handle_a, to_block_on_a, dry_run=dry_run)
 
-    # Everyone who follows A but not B → block on B
-    to_block_on_b = sorted(((followers_a - followers_b) - blocks_b) - {did_b})
     if to_block_on_b:
         log(f"🚫 Blocking {len(to_block_on_b)} of A's exclusive followers on B...")
-        _block_accounts(client_b, handle_b, to_block_on_b, dry_run=dry_run)
+        applied_b = _block_accounts(client_b, handle_b, to_block_on_b, dry_run=dry_run)
 
-    if not to_block_on_a and not to_block_on_b:
-        log("✓ Nothing to do. Accounts are already in sync.", LogColor.SUCCESS)
-    else:
-        log("✓ Sync complete.", LogColor.SUCCESS)
+    # Only a real run that applied everything may advance the snapshots;
+    # dry runs and failed batches must stay visible to the next run.
+    if not dry_run and applied_a and applied_b:
+        _write_follower_snapshot(did_a, followers_a)
+        _write_follower_snapshot(did_b, followers_b)
+
+    log("✓ Sync complete.", LogColor.SUCCESS)
 
 
 if __name__ == "__main__":